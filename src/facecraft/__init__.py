@@ -1,9 +1,9 @@
-"""
-Facecraft - AI Portrait Processing API
-
-Professional portrait/headshot processing with AI-powered background removal,
-face detection, alignment, and enhancement.
-"""
-
-__version__ = "1.0.0"
-__author__ = "OBVT Toolbox"
+"""
+Facecraft - AI Portrait Processing API
+
+Professional portrait/headshot processing with AI-powered background removal,
+face detection, alignment, and enhancement.
+"""
+
+__version__ = "1.0.0"
+__author__ = "OBVT Toolbox"
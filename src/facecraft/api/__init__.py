@@ -1 +1 @@
-"""FastAPI application and routes."""
+"""FastAPI application and routes."""
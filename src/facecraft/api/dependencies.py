@@ -1,101 +1,213 @@
-"""FastAPI dependencies for dependency injection."""
-
-import time
-from pathlib import Path
-from typing import Optional
-from functools import lru_cache
-
-from facecraft.processing.processor import PhotoProcessor
-from facecraft.core.config import settings
-
-
-# Global state
-_processor: Optional[PhotoProcessor] = None
-_start_time: float = time.time()
-_processing_times: list[float] = []
-
-
-def init_processor() -> PhotoProcessor:
-    """Initialize the photo processor with models."""
-    global _processor, _start_time
-
-    predictor_path = settings.get_predictor_path()
-    codeformer_path = settings.get_codeformer_path()
-    device = settings.get_device()
-
-    _processor = PhotoProcessor(
-        predictor_path=str(predictor_path) if predictor_path else None,
-        codeformer_path=str(codeformer_path) if codeformer_path else None,
-        device=device
-    )
-
-    _start_time = time.time()
-    return _processor
-
-
-def get_processor() -> PhotoProcessor:
-    """Get the photo processor instance."""
-    global _processor
-    if _processor is None:
-        _processor = init_processor()
-    return _processor
-
-
-def get_start_time() -> float:
-    """Get the server start time."""
-    return _start_time
-
-
-def get_processing_stats() -> dict:
-    """Get processing statistics."""
-    processor = get_processor()
-    stats = processor.get_stats()
-
-    # Calculate average processing time
-    if _processing_times:
-        stats['avg_processing_ms'] = sum(_processing_times) / len(_processing_times)
-    else:
-        stats['avg_processing_ms'] = 0.0
-
-    return stats
-
-
-def record_processing_time(ms: float):
-    """Record a processing time for statistics."""
-    global _processing_times
-    _processing_times.append(ms)
-    # Keep only last 100 measurements
-    if len(_processing_times) > 100:
-        _processing_times = _processing_times[-100:]
-
-
-def get_upload_dir() -> Path:
-    """Get the upload directory."""
-    upload_dir = settings.upload_dir
-    upload_dir.mkdir(parents=True, exist_ok=True)
-    return upload_dir
-
-
-def get_output_dir() -> Path:
-    """Get the output directory."""
-    output_dir = settings.output_dir
-    output_dir.mkdir(parents=True, exist_ok=True)
-    return output_dir
-
-
-def cleanup_old_files(max_age_hours: int = 24):
-    """Clean up old files from upload and output directories."""
-    import os
-
-    now = time.time()
-    max_age_seconds = max_age_hours * 3600
-
-    for directory in [settings.upload_dir, settings.output_dir]:
-        if not directory.exists():
-            continue
-
-        for file_path in directory.rglob("*"):
-            if file_path.is_file():
-                file_age = now - file_path.stat().st_mtime
-                if file_age > max_age_seconds:
-                    file_path.unlink()
+"""FastAPI dependencies for dependency injection."""
+
+import os
+import time
+import threading
+from pathlib import Path
+from typing import Optional, Union
+from functools import cache
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from facecraft.processing.processor import PhotoProcessor
+from facecraft.api.schemas.responses import DeviceInfo
+from facecraft.core.config import settings
+
+
+# Global state
+_processor: Optional[PhotoProcessor] = None
+_executor: Optional[ThreadPoolExecutor] = None
+_start_time: float = time.time()
+
+# Rolling window of recent processing times (fixed-size ring buffer)
+_TIMES_WINDOW = 100
+_times = np.zeros(_TIMES_WINDOW, dtype=np.float64)
+_times_idx = 0
+_times_count = 0
+_times_sum = 0.0
+_times_lock = threading.Lock()
+
+
+def init_processor() -> PhotoProcessor:
+    """Initialize the photo processor with models."""
+    global _processor, _start_time
+
+    predictor_path = settings.get_predictor_path()
+    codeformer_path = settings.get_codeformer_path()
+    device = settings.get_device()
+
+    _processor = PhotoProcessor(
+        predictor_path=str(predictor_path) if predictor_path else None,
+        codeformer_path=str(codeformer_path) if codeformer_path else None,
+        device=device,
+        face_batch_size=settings.face_batch_size,
+        face_batch_wait_ms=settings.face_batch_wait_ms,
+        torch_compile=settings.torch_compile,
+        cuda_graphs=settings.cuda_graphs
+    )
+
+    _start_time = time.time()
+    return _processor
+
+
+def get_processor() -> PhotoProcessor:
+    """Get the photo processor instance."""
+    global _processor
+    if _processor is None:
+        _processor = init_processor()
+    return _processor
+
+
+def get_executor() -> ThreadPoolExecutor:
+    """Get the shared executor used for CPU/GPU-bound processing."""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.max_concurrent_jobs,
+            thread_name_prefix="facecraft-worker"
+        )
+    return _executor
+
+
+def shutdown_executor():
+    """Shut down the shared executor, waiting for running jobs."""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=True)
+        _executor = None
+
+
+def get_start_time() -> float:
+    """Get the server start time."""
+    return _start_time
+
+
+@cache
+def get_device_info() -> DeviceInfo:
+    """Probe the compute device once; the result is cached for /status."""
+    try:
+        import torch
+    except ImportError:
+        return DeviceInfo(type="cpu")
+
+    if not torch.cuda.is_available():
+        return DeviceInfo(type="cpu")
+
+    return DeviceInfo(
+        type="cuda",
+        name=torch.cuda.get_device_name(0),
+        cuda_version=torch.version.cuda
+    )
+
+
+def get_processing_stats() -> dict:
+    """Get processing statistics."""
+    processor = get_processor()
+    stats = processor.get_stats()
+
+    # Average over the rolling window (sum is maintained on write)
+    with _times_lock:
+        stats['avg_processing_ms'] = _times_sum / _times_count if _times_count else 0.0
+
+    return stats
+
+
+def record_processing_time(ms: float):
+    """Record a processing time for statistics."""
+    global _times_idx, _times_count, _times_sum
+    with _times_lock:
+        # Overwrite the oldest slot once the window is full
+        slot = _times_idx % _TIMES_WINDOW
+        _times_sum += ms - _times[slot]
+        _times[slot] = ms
+        _times_idx += 1
+        _times_count = min(_times_count + 1, _TIMES_WINDOW)
+
+
+@cache
+def get_upload_dir() -> Path:
+    """Get the upload directory (created once, then cached)."""
+    upload_dir = settings.upload_dir
+    upload_dir.mkdir(parents=True, exist_ok=True)
+    return upload_dir
+
+
+@cache
+def get_output_dir() -> Path:
+    """Get the output directory (created once, then cached)."""
+    output_dir = settings.output_dir
+    output_dir.mkdir(parents=True, exist_ok=True)
+    return output_dir
+
+
+def fast_rmtree(root: Union[str, Path]):
+    """Recursively delete a directory tree using cached scandir entry types.
+
+    A symlinked root is unlinked rather than followed, so the link target
+    is never emptied.
+    """
+    if os.path.islink(root):
+        os.unlink(root)
+        return
+
+    with os.scandir(root) as entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                fast_rmtree(entry.path)
+            else:
+                os.unlink(entry.path)
+    os.rmdir(root)
+
+
+def _newest_mtime(directory: str) -> float:
+    """Return the latest mtime of a directory and everything below it."""
+    newest = os.lstat(directory).st_mtime
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                newest = max(newest, _newest_mtime(entry.path))
+            else:
+                newest = max(newest, entry.stat(follow_symlinks=False).st_mtime)
+    return newest
+
+
+def _iter_old_entries(directory: str, cutoff: float):
+    """Yield (path, is_dir) for entries of directory last modified before cutoff.
+
+    A subdirectory counts as old only if nothing inside it is newer than
+    the cutoff.
+    """
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            is_dir = entry.is_dir(follow_symlinks=False)
+            if is_dir:
+                mtime = _newest_mtime(entry.path)
+            else:
+                mtime = entry.stat(follow_symlinks=False).st_mtime
+            if mtime < cutoff:
+                yield entry.path, is_dir
+
+
+def cleanup_old_files(max_age_hours: int = 24):
+    """Clean up old files from upload and output directories.
+
+    Job directories are removed as a whole once every file inside them
+    is older than the cutoff.
+    """
+    cutoff = time.time() - max_age_hours * 3600
+
+    for directory in [settings.upload_dir, settings.output_dir]:
+        try:
+            old_entries = list(_iter_old_entries(os.fspath(directory), cutoff))
+        except FileNotFoundError:
+            continue
+
+        for path, is_dir in old_entries:
+            try:
+                if is_dir:
+                    fast_rmtree(path)
+                else:
+                    os.unlink(path)
+            except FileNotFoundError:
+                pass
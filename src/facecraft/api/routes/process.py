@@ -1,348 +1,514 @@
-"""Image processing endpoints."""
-
-import time
-import uuid
-import shutil
-import base64
-import json
-from pathlib import Path
-from typing import Optional
-
-from fastapi import APIRouter, File, UploadFile, HTTPException, Form, Depends
-from fastapi.responses import FileResponse
-
-from facecraft.api.schemas.requests import ProcessingOptionsRequest
-from facecraft.api.schemas.responses import (
-    ProcessResponse,
-    ProcessResult,
-    FacePosition,
-    BatchResponse,
-    BatchResultItem,
-)
-from facecraft.api.dependencies import get_processor, get_upload_dir, get_output_dir
-from facecraft.processing.processor import PhotoProcessor
-from facecraft.core.config import settings
-
-router = APIRouter(prefix="/api/v1", tags=["processing"])
-
-
-@router.post("/process", response_model=ProcessResponse)
-async def process_single_photo(
-    file: UploadFile = File(...),
-    width: int = Form(default=648),
-    height: int = Form(default=648),
-    background_r: int = Form(default=240),
-    background_g: int = Form(default=240),
-    background_b: int = Form(default=240),
-    face_margin: float = Form(default=0.3),
-    use_oval_mask: bool = Form(default=True),
-    enhance_face: bool = Form(default=True),
-    enhance_fidelity: float = Form(default=0.7),
-    return_base64: bool = Form(default=False),
-    processor: PhotoProcessor = Depends(get_processor),
-    upload_dir: Path = Depends(get_upload_dir),
-    output_dir: Path = Depends(get_output_dir),
-):
-    """
-    Process a single photo.
-
-    Upload an image and receive a processed portrait with:
-    - Background removed
-    - Face detected and centered
-    - Quality enhanced
-    - Optional oval mask applied
-
-    **Parameters:**
-    - **file**: Image to process (JPG, PNG, etc.)
-    - **width/height**: Output dimensions (default: 648x648)
-    - **background_r/g/b**: Background color RGB values
-    - **face_margin**: Margin around face (0.0-1.0)
-    - **use_oval_mask**: Apply oval mask with transparency
-    - **enhance_face**: Use AI face enhancement
-    - **enhance_fidelity**: Face enhancement fidelity (0.0-1.0)
-    - **return_base64**: Return images as base64 in response
-
-    **Returns:**
-    - Job ID for downloading results
-    - Processing statistics
-    - Download URLs for PNG and JPG versions
-    """
-    start_time = time.time()
-    job_id = str(uuid.uuid4())[:8]
-
-    # Validate file
-    if not file.filename:
-        raise HTTPException(status_code=400, detail="No file provided")
-
-    allowed_extensions = {'.jpg', '.jpeg', '.png', '.bmp', '.webp'}
-    file_ext = Path(file.filename).suffix.lower()
-    if file_ext not in allowed_extensions:
-        raise HTTPException(
-            status_code=400,
-            detail=f"Invalid format. Allowed: {', '.join(allowed_extensions)}"
-        )
-
-    # Save uploaded file
-    upload_path = upload_dir / f"{job_id}_{file.filename}"
-    try:
-        with open(upload_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to save file: {e}")
-
-    # Prepare output paths
-    job_output_dir = output_dir / job_id
-    job_output_dir.mkdir(parents=True, exist_ok=True)
-    output_path = job_output_dir / f"{Path(file.filename).stem}.png"
-
-    # Create processing options
-    from facecraft.processing.processor import ProcessingOptions
-    options = ProcessingOptions(
-        width=width,
-        height=height,
-        background_color=(background_r, background_g, background_b),
-        face_margin=face_margin,
-        use_oval_mask=use_oval_mask,
-        enhance_face=enhance_face,
-        enhance_fidelity=enhance_fidelity,
-        enhance_photo=True,
-        max_jpeg_size_kb=99
-    )
-
-    # Process image
-    try:
-        result = processor.process_image(str(upload_path), str(output_path), options)
-    except Exception as e:
-        upload_path.unlink(missing_ok=True)
-        raise HTTPException(status_code=500, detail=f"Processing failed: {e}")
-
-    # Cleanup upload
-    upload_path.unlink(missing_ok=True)
-
-    # Calculate processing time
-    processing_time = int((time.time() - start_time) * 1000)
-
-    if not result.success:
-        error_messages = {
-            "no_face_detected": "No face could be detected in the image"
-        }
-        return ProcessResponse(
-            success=False,
-            job_id=job_id,
-            processing_time_ms=processing_time,
-            error=result.error,
-            error_message=error_messages.get(result.error, result.error)
-        )
-
-    # Build response
-    response = ProcessResponse(
-        success=True,
-        job_id=job_id,
-        processing_time_ms=processing_time,
-        result=ProcessResult(
-            face_detected=result.face_detected,
-            face_count=result.face_count,
-            face_position=FacePosition(**result.face_position) if result.face_position else None,
-            output_size={"width": width, "height": height},
-            file_size_bytes=result.file_size_bytes
-        ),
-        png_url=f"/api/v1/download/{job_id}/png" if result.png_path else None,
-        jpg_url=f"/api/v1/download/{job_id}/jpg" if result.jpg_path else None
-    )
-
-    # Add base64 if requested
-    if return_base64:
-        if result.png_path and Path(result.png_path).exists():
-            with open(result.png_path, "rb") as f:
-                response.png_base64 = base64.b64encode(f.read()).decode()
-        if result.jpg_path and Path(result.jpg_path).exists():
-            with open(result.jpg_path, "rb") as f:
-                response.jpg_base64 = base64.b64encode(f.read()).decode()
-
-    return response
-
-
-@router.post("/process/quick")
-async def process_quick(
-    file: UploadFile = File(...),
-    size: int = Form(default=648),
-    processor: PhotoProcessor = Depends(get_processor),
-):
-    """
-    Quick processing with sensible defaults.
-
-    Returns the processed image directly (PNG format).
-    Ideal for simple integrations.
-    """
-    import tempfile
-
-    # Validate file
-    if not file.filename:
-        raise HTTPException(status_code=400, detail="No file provided")
-
-    # Read file content
-    content = await file.read()
-
-    # Create processing options
-    from facecraft.processing.processor import ProcessingOptions
-    options = ProcessingOptions(
-        width=size,
-        height=size,
-        use_oval_mask=True,
-        enhance_face=True,
-        enhance_photo=True
-    )
-
-    # Process
-    png_bytes, _, result = processor.process_image_bytes(content, options)
-
-    if not result.success:
-        raise HTTPException(status_code=400, detail=result.error or "Processing failed")
-
-    if not png_bytes:
-        raise HTTPException(status_code=500, detail="No output generated")
-
-    # Return PNG directly
-    from fastapi.responses import Response
-    return Response(content=png_bytes, media_type="image/png")
-
-
-@router.get("/download/{job_id}/{format}")
-async def download_processed_photo(
-    job_id: str,
-    format: str,
-    output_dir: Path = Depends(get_output_dir)
-):
-    """
-    Download processed photo.
-
-    **Parameters:**
-    - **job_id**: Job ID from processing response
-    - **format**: "png" or "jpg"
-    """
-    job_output_dir = output_dir / job_id
-
-    if not job_output_dir.exists():
-        raise HTTPException(status_code=404, detail="Job not found")
-
-    if format == "png":
-        png_files = list(job_output_dir.glob("*.png"))
-        if not png_files:
-            raise HTTPException(status_code=404, detail="PNG file not found")
-        return FileResponse(png_files[0], media_type="image/png")
-
-    elif format == "jpg":
-        jpg_dir = job_output_dir / "jpg"
-        jpg_files = list(jpg_dir.glob("*.jpg")) if jpg_dir.exists() else []
-        if not jpg_files:
-            raise HTTPException(status_code=404, detail="JPG file not found")
-        return FileResponse(jpg_files[0], media_type="image/jpeg")
-
-    else:
-        raise HTTPException(status_code=400, detail="Invalid format. Use 'png' or 'jpg'")
-
-
-@router.delete("/jobs/{job_id}")
-async def cleanup_job(
-    job_id: str,
-    output_dir: Path = Depends(get_output_dir)
-):
-    """
-    Delete job files to free up space.
-
-    **Parameters:**
-    - **job_id**: Job ID to delete
-    """
-    job_output_dir = output_dir / job_id
-
-    if job_output_dir.exists():
-        shutil.rmtree(job_output_dir)
-        return {"message": f"Job {job_id} deleted"}
-
-    return {"message": f"Job {job_id} not found"}
-
-
-@router.post("/process/batch", response_model=BatchResponse)
-async def process_batch(
-    files: list[UploadFile] = File(...),
-    width: int = Form(default=648),
-    height: int = Form(default=648),
-    return_base64: bool = Form(default=True),
-    processor: PhotoProcessor = Depends(get_processor),
-    upload_dir: Path = Depends(get_upload_dir),
-    output_dir: Path = Depends(get_output_dir),
-):
-    """
-    Process multiple photos at once.
-
-    **Parameters:**
-    - **files**: Multiple image files
-    - **width/height**: Output dimensions
-    - **return_base64**: Include base64 encoded images in response
-
-    **Returns:**
-    - Results for each processed image
-    - Overall success/failure counts
-    """
-    start_time = time.time()
-    job_id = str(uuid.uuid4())[:8]
-    results = []
-
-    from facecraft.processing.processor import ProcessingOptions
-    options = ProcessingOptions(
-        width=width,
-        height=height,
-        use_oval_mask=True,
-        enhance_face=True,
-        enhance_photo=True,
-        max_jpeg_size_kb=99
-    )
-
-    for idx, file in enumerate(files):
-        try:
-            # Save file
-            upload_path = upload_dir / f"{job_id}_{idx}_{file.filename}"
-            with open(upload_path, "wb") as buffer:
-                shutil.copyfileobj(file.file, buffer)
-
-            # Process
-            file_output_dir = output_dir / job_id / Path(file.filename).stem
-            file_output_dir.mkdir(parents=True, exist_ok=True)
-            output_path = file_output_dir / f"{Path(file.filename).stem}.png"
-
-            result = processor.process_image(str(upload_path), str(output_path), options)
-
-            item = BatchResultItem(
-                filename=file.filename,
-                success=result.success,
-                error=result.error if not result.success else None,
-                error_message=result.error if not result.success else None
-            )
-
-            if result.success:
-                item.download_url = f"/api/v1/download/{job_id}/{Path(file.filename).stem}/png"
-
-            results.append(item)
-
-            # Cleanup upload
-            upload_path.unlink(missing_ok=True)
-
-        except Exception as e:
-            results.append(BatchResultItem(
-                filename=file.filename,
-                success=False,
-                error="processing_error",
-                error_message=str(e)
-            ))
-
-    processing_time = int((time.time() - start_time) * 1000)
-    successful = sum(1 for r in results if r.success)
-
-    return BatchResponse(
-        job_id=job_id,
-        total=len(files),
-        successful=successful,
-        failed=len(files) - successful,
-        processing_time_ms=processing_time,
-        results=results
-    )
+"""Image processing endpoints."""
+
+import time
+import secrets
+import shutil
+import base64
+import json
+import asyncio
+from pathlib import Path
+from typing import Optional
+from concurrent.futures import ThreadPoolExecutor
+
+from fastapi import APIRouter, File, UploadFile, HTTPException, Form, Depends
+from fastapi.responses import FileResponse, Response
+from starlette.concurrency import run_in_threadpool
+
+try:
+    import aiofiles
+except ImportError:
+    aiofiles = None
+
+from facecraft.api.schemas.requests import ProcessingOptionsRequest
+from facecraft.api.schemas.responses import (
+    ProcessResponse,
+    ProcessResult,
+    FacePosition,
+    BatchResponse,
+    BatchResultItem,
+)
+from facecraft.api.dependencies import (
+    get_processor,
+    get_executor,
+    get_upload_dir,
+    get_output_dir,
+    record_processing_time,
+    fast_rmtree,
+)
+from facecraft.processing.processor import PhotoProcessor, ProcessingOptions, ProcessingResult
+from facecraft.core.config import settings
+
+router = APIRouter(prefix="/api/v1", tags=["processing"])
+
+# Download URL templates returned in responses
+_DOWNLOAD_URL = router.prefix + "/download/{job_id}/{format}"
+_BATCH_DOWNLOAD_URL = router.prefix + "/download/{job_id}/{name}/png"
+
+# Accepted upload formats
+_ALLOWED_EXTENSIONS = frozenset({'.jpg', '.jpeg', '.png', '.bmp', '.webp'})
+_INVALID_FORMAT_MESSAGE = f"Invalid format. Allowed: {', '.join(sorted(_ALLOWED_EXTENSIONS))}"
+
+# Chunk size used when streaming uploads to disk
+_UPLOAD_CHUNK_SIZE = 1 << 20  # 1 MiB
+_SMALL_UPLOAD_SIZE = 4 << 20  # 4 MiB
+
+# Small dedicated pool for base64 encoding large images, kept separate from
+# the processing workers and Starlette's threadpool
+_encode_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="facecraft-encode")
+
+# Per-job file listing the output files of that job
+_MANIFEST_NAME = "manifest.json"
+
+
+def _copy_upload(file: UploadFile, path: Path):
+    """Copy an uploaded file to disk synchronously."""
+    with open(path, "wb") as buffer:
+        shutil.copyfileobj(file.file, buffer, _UPLOAD_CHUNK_SIZE)
+
+
+async def _save_upload(file: UploadFile, path: Path):
+    """Stream an uploaded file to disk without blocking the event loop."""
+    if aiofiles is None:
+        await run_in_threadpool(_copy_upload, file, path)
+        return
+
+    async with aiofiles.open(path, "wb") as buffer:
+        # Small uploads are read in one go; larger ones are streamed in chunks
+        if file.size is not None and file.size <= _SMALL_UPLOAD_SIZE:
+            await buffer.write(await file.read())
+            return
+
+        while chunk := await file.read(_UPLOAD_CHUNK_SIZE):
+            await buffer.write(chunk)
+
+
+def _write_manifest(job_output_dir: Path, result: ProcessingResult):
+    """Write the job manifest mapping each format to its output file."""
+    manifest = {}
+    if result.png_path:
+        manifest["png"] = Path(result.png_path).relative_to(job_output_dir).as_posix()
+    if result.jpg_path:
+        manifest["jpg"] = Path(result.jpg_path).relative_to(job_output_dir).as_posix()
+    (job_output_dir / _MANIFEST_NAME).write_text(json.dumps(manifest))
+
+
+def _read_manifest(job_output_dir: Path) -> Optional[dict]:
+    """Read the job manifest, or None if the job has none."""
+    try:
+        return json.loads((job_output_dir / _MANIFEST_NAME).read_text())
+    except (FileNotFoundError, NotADirectoryError, ValueError):
+        return None
+
+
+def _find_output(
+    job_output_dir: Path,
+    manifest: Optional[dict],
+    format: str,
+    subdir: str,
+    pattern: str
+) -> Optional[Path]:
+    """Locate a job output file via the manifest, scanning only as a fallback."""
+    if manifest is not None:
+        name = manifest.get(format)
+        return job_output_dir / name if name else None
+
+    # Jobs created without a manifest
+    search_dir = job_output_dir / subdir
+    if not search_dir.is_dir():
+        return None
+    return next(search_dir.glob(pattern), None)
+
+
+async def _encode_base64(data: Optional[bytes]) -> Optional[str]:
+    """Base64-encode image bytes off the event loop."""
+    if not data:
+        return None
+    loop = asyncio.get_running_loop()
+    encoded = await loop.run_in_executor(_encode_pool, base64.b64encode, data)
+    return encoded.decode()
+
+
+@router.post("/process", response_model=ProcessResponse)
+async def process_single_photo(
+    file: UploadFile = File(...),
+    width: int = Form(default=648),
+    height: int = Form(default=648),
+    background_r: int = Form(default=240),
+    background_g: int = Form(default=240),
+    background_b: int = Form(default=240),
+    face_margin: float = Form(default=0.3),
+    use_oval_mask: bool = Form(default=True),
+    enhance_face: bool = Form(default=True),
+    enhance_fidelity: float = Form(default=0.7),
+    return_base64: bool = Form(default=False),
+    persist: bool = Form(default=True),
+    processor: PhotoProcessor = Depends(get_processor),
+    executor: ThreadPoolExecutor = Depends(get_executor),
+    upload_dir: Path = Depends(get_upload_dir),
+    output_dir: Path = Depends(get_output_dir),
+):
+    """
+    Process a single photo.
+
+    Upload an image and receive a processed portrait with:
+    - Background removed
+    - Face detected and centered
+    - Quality enhanced
+    - Optional oval mask applied
+
+    **Parameters:**
+    - **file**: Image to process (JPG, PNG, etc.)
+    - **width/height**: Output dimensions (default: 648x648)
+    - **background_r/g/b**: Background color RGB values
+    - **face_margin**: Margin around face (0.0-1.0)
+    - **use_oval_mask**: Apply oval mask with transparency
+    - **enhance_face**: Use AI face enhancement
+    - **enhance_fidelity**: Face enhancement fidelity (0.0-1.0)
+    - **return_base64**: Return images as base64 in response
+    - **persist**: Keep outputs on disk for download (set to false together
+      with return_base64 to skip writing files entirely)
+
+    **Returns:**
+    - Job ID for downloading results
+    - Processing statistics
+    - Download URLs for PNG and JPG versions
+    """
+    start_time = time.time()
+    job_id = secrets.token_hex(4)
+
+    # Validate file
+    if not file.filename:
+        raise HTTPException(status_code=400, detail="No file provided")
+
+    file_ext = Path(file.filename).suffix.lower()
+    if file_ext not in _ALLOWED_EXTENSIONS:
+        raise HTTPException(status_code=400, detail=_INVALID_FORMAT_MESSAGE)
+
+    # Create processing options
+    options = ProcessingOptions(
+        width=width,
+        height=height,
+        background_color=(background_r, background_g, background_b),
+        face_margin=face_margin,
+        use_oval_mask=use_oval_mask,
+        enhance_face=enhance_face,
+        enhance_fidelity=enhance_fidelity,
+        enhance_photo=True,
+        max_jpeg_size_kb=99
+    )
+
+    # Outputs only need to hit the disk if they can be downloaded later
+    persist = persist or not return_base64
+    png_bytes = jpg_bytes = None
+    loop = asyncio.get_running_loop()
+
+    if persist:
+        # Save uploaded file
+        upload_path = upload_dir / f"{job_id}_{file.filename}"
+        try:
+            await _save_upload(file, upload_path)
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Failed to save file: {e}")
+
+        # Prepare output paths
+        job_output_dir = output_dir / job_id
+        output_path = job_output_dir / f"{Path(file.filename).stem}.png"
+
+        # Process image on the worker pool so the event loop stays free
+        try:
+            result = await loop.run_in_executor(
+                executor, processor.process_image, str(upload_path), str(output_path), options
+            )
+        except Exception as e:
+            upload_path.unlink(missing_ok=True)
+            raise HTTPException(status_code=500, detail=f"Processing failed: {e}")
+
+        # Cleanup upload
+        upload_path.unlink(missing_ok=True)
+    else:
+        # Process in memory; the images are only returned inline
+        content = await file.read()
+        try:
+            png_bytes, jpg_bytes, result = await loop.run_in_executor(
+                executor, processor.process_image_bytes, content, options
+            )
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Processing failed: {e}")
+
+    # Calculate processing time
+    processing_time = int((time.time() - start_time) * 1000)
+    record_processing_time(processing_time)
+
+    if not result.success:
+        error_messages = {
+            "no_face_detected": "No face could be detected in the image"
+        }
+        return ProcessResponse(
+            success=False,
+            job_id=job_id,
+            processing_time_ms=processing_time,
+            error=result.error,
+            error_message=error_messages.get(result.error, result.error)
+        )
+
+    if persist:
+        # Record output file names so downloads don't need to scan the job directory
+        _write_manifest(job_output_dir, result)
+
+    # Build response
+    response = ProcessResponse(
+        success=True,
+        job_id=job_id,
+        processing_time_ms=processing_time,
+        result=ProcessResult(
+            face_detected=result.face_detected,
+            face_count=result.face_count,
+            face_position=FacePosition(**result.face_position) if result.face_position else None,
+            output_size={"width": width, "height": height},
+            file_size_bytes=result.file_size_bytes
+        ),
+        png_url=_DOWNLOAD_URL.format(job_id=job_id, format="png") if persist and result.png_path else None,
+        jpg_url=_DOWNLOAD_URL.format(job_id=job_id, format="jpg") if persist and result.jpg_path else None
+    )
+
+    # Add base64 if requested; persisted runs keep the bytes they wrote
+    if return_base64:
+        if persist:
+            png_bytes, jpg_bytes = result.png_bytes, result.jpg_bytes
+        response.png_base64, response.jpg_base64 = await asyncio.gather(
+            _encode_base64(png_bytes),
+            _encode_base64(jpg_bytes)
+        )
+
+    return response
+
+
+@router.post("/process/quick")
+async def process_quick(
+    file: UploadFile = File(...),
+    size: int = Form(default=648),
+    processor: PhotoProcessor = Depends(get_processor),
+    executor: ThreadPoolExecutor = Depends(get_executor),
+):
+    """
+    Quick processing with sensible defaults.
+
+    Returns the processed image directly (PNG format).
+    Ideal for simple integrations.
+    """
+    start_time = time.time()
+
+    # Validate file
+    if not file.filename:
+        raise HTTPException(status_code=400, detail="No file provided")
+
+    # Read file content
+    content = await file.read()
+
+    # Create processing options
+    options = ProcessingOptions(
+        width=size,
+        height=size,
+        use_oval_mask=True,
+        enhance_face=True,
+        enhance_photo=True
+    )
+
+    # Process
+    loop = asyncio.get_running_loop()
+    png_bytes, _, result = await loop.run_in_executor(
+        executor, processor.process_image_bytes, content, options
+    )
+    record_processing_time(int((time.time() - start_time) * 1000))
+
+    if not result.success:
+        raise HTTPException(status_code=400, detail=result.error or "Processing failed")
+
+    if not png_bytes:
+        raise HTTPException(status_code=500, detail="No output generated")
+
+    # Return PNG directly
+    return Response(content=png_bytes, media_type="image/png")
+
+
+@router.get("/download/{job_id}/{format}")
+async def download_processed_photo(
+    job_id: str,
+    format: str,
+    output_dir: Path = Depends(get_output_dir)
+):
+    """
+    Download processed photo.
+
+    **Parameters:**
+    - **job_id**: Job ID from processing response
+    - **format**: "png" or "jpg"
+    """
+    job_output_dir = output_dir / job_id
+    manifest = _read_manifest(job_output_dir)
+
+    if manifest is None and not job_output_dir.exists():
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    if format == "png":
+        png_file = _find_output(job_output_dir, manifest, "png", ".", "*.png")
+        if png_file is None:
+            raise HTTPException(status_code=404, detail="PNG file not found")
+        return FileResponse(png_file, media_type="image/png")
+
+    elif format == "jpg":
+        jpg_file = _find_output(job_output_dir, manifest, "jpg", "jpg", "*.jpg")
+        if jpg_file is None:
+            raise HTTPException(status_code=404, detail="JPG file not found")
+        return FileResponse(jpg_file, media_type="image/jpeg")
+
+    else:
+        raise HTTPException(status_code=400, detail="Invalid format. Use 'png' or 'jpg'")
+
+
+@router.delete("/jobs/{job_id}")
+async def cleanup_job(
+    job_id: str,
+    output_dir: Path = Depends(get_output_dir)
+):
+    """
+    Delete job files to free up space.
+
+    **Parameters:**
+    - **job_id**: Job ID to delete
+    """
+    job_output_dir = output_dir / job_id
+
+    try:
+        fast_rmtree(job_output_dir)
+    except (FileNotFoundError, NotADirectoryError):
+        return {"message": f"Job {job_id} not found"}
+
+    return {"message": f"Job {job_id} deleted"}
+
+
+def _process_batch_file(
+    processor: PhotoProcessor,
+    index: int,
+    filename: str,
+    upload_path: Path,
+    save_error: Optional[BaseException],
+    batch_output_dir: Path,
+    job_id: str,
+    options: ProcessingOptions
+) -> BatchResultItem:
+    """Process a single file of a batch (runs on the worker pool)."""
+    try:
+        if save_error is not None:
+            raise save_error
+
+        # Process (the index keeps uploads sharing a stem apart)
+        stem = Path(filename).stem
+        name = f"{index}_{stem}"
+        file_output_dir = batch_output_dir / name
+        output_path = file_output_dir / f"{stem}.png"
+
+        start_time = time.time()
+        result = processor.process_image(str(upload_path), str(output_path), options)
+        record_processing_time(int((time.time() - start_time) * 1000))
+
+        item = BatchResultItem(
+            filename=filename,
+            success=result.success,
+            error=result.error if not result.success else None,
+            error_message=result.error if not result.success else None
+        )
+
+        if result.success:
+            item.download_url = _BATCH_DOWNLOAD_URL.format(job_id=job_id, name=name)
+
+        # Cleanup upload
+        upload_path.unlink(missing_ok=True)
+
+        return item
+
+    except Exception as e:
+        return BatchResultItem(
+            filename=filename,
+            success=False,
+            error="processing_error",
+            error_message=str(e)
+        )
+
+
+@router.post("/process/batch", response_model=BatchResponse)
+async def process_batch(
+    files: list[UploadFile] = File(...),
+    width: int = Form(default=648),
+    height: int = Form(default=648),
+    return_base64: bool = Form(default=True),
+    processor: PhotoProcessor = Depends(get_processor),
+    executor: ThreadPoolExecutor = Depends(get_executor),
+    upload_dir: Path = Depends(get_upload_dir),
+    output_dir: Path = Depends(get_output_dir),
+):
+    """
+    Process multiple photos at once.
+
+    **Parameters:**
+    - **files**: Multiple image files
+    - **width/height**: Output dimensions
+    - **return_base64**: Include base64 encoded images in response
+
+    **Returns:**
+    - Results for each processed image
+    - Overall success/failure counts
+    """
+    start_time = time.time()
+    job_id = secrets.token_hex(4)
+
+    options = ProcessingOptions(
+        width=width,
+        height=height,
+        use_oval_mask=True,
+        enhance_face=True,
+        enhance_photo=True,
+        max_jpeg_size_kb=99
+    )
+
+    # Save all uploads concurrently
+    upload_paths = [
+        upload_dir / f"{job_id}_{idx}_{file.filename}"
+        for idx, file in enumerate(files)
+    ]
+    save_errors = await asyncio.gather(
+        *(_save_upload(file, path) for file, path in zip(files, upload_paths)),
+        return_exceptions=True
+    )
+
+    # Process files in parallel on the worker pool
+    loop = asyncio.get_running_loop()
+    results = await asyncio.gather(*(
+        loop.run_in_executor(
+            executor,
+            _process_batch_file,
+            processor,
+            idx,
+            file.filename,
+            upload_path,
+            save_error,
+            output_dir / job_id,
+            job_id,
+            options
+        )
+        for idx, (file, upload_path, save_error) in enumerate(
+            zip(files, upload_paths, save_errors)
+        )
+    ))
+
+    processing_time = int((time.time() - start_time) * 1000)
+    successful = sum(1 for r in results if r.success)
+
+    return BatchResponse(
+        job_id=job_id,
+        total=len(files),
+        successful=successful,
+        failed=len(files) - successful,
+        processing_time_ms=processing_time,
+        results=results
+    )
@@ -1,19 +1,19 @@
-"""Pydantic schemas for API requests and responses."""
-
-from .requests import ProcessingOptionsRequest
-from .responses import (
-    HealthResponse,
-    ReadyResponse,
-    StatusResponse,
-    ProcessResponse,
-    BatchResponse,
-)
-
-__all__ = [
-    "ProcessingOptionsRequest",
-    "HealthResponse",
-    "ReadyResponse",
-    "StatusResponse",
-    "ProcessResponse",
-    "BatchResponse",
-]
+"""Pydantic schemas for API requests and responses."""
+
+from .requests import ProcessingOptionsRequest
+from .responses import (
+    HealthResponse,
+    ReadyResponse,
+    StatusResponse,
+    ProcessResponse,
+    BatchResponse,
+)
+
+__all__ = [
+    "ProcessingOptionsRequest",
+    "HealthResponse",
+    "ReadyResponse",
+    "StatusResponse",
+    "ProcessResponse",
+    "BatchResponse",
+]
@@ -1,5 +1,5 @@
-"""Core module with configuration and utilities."""
-
-from .config import settings
-
-__all__ = ["settings"]
+"""Core module with configuration and utilities."""
+
+from .config import settings
+
+__all__ = ["settings"]
@@ -1,5 +1,5 @@
-"""Image processing modules for portrait enhancement."""
-
-from .processor import PhotoProcessor
-
-__all__ = ["PhotoProcessor"]
+"""Image processing modules for portrait enhancement."""
+
+from .processor import PhotoProcessor
+
+__all__ = ["PhotoProcessor"]
@@ -1,79 +1,189 @@
-"""Background removal using rembg with u2net_human_seg model."""
-
-import cv2
-import numpy as np
-from PIL import Image
-from rembg import remove, new_session
-from typing import Optional
-
-
-class BackgroundRemover:
-    """AI-powered background removal using u2net_human_seg model."""
-
-    def __init__(self, model_name: str = "u2net_human_seg"):
-        """
-        Initialize the background remover.
-
-        Args:
-            model_name: The rembg model to use. Default is u2net_human_seg
-                       which is optimized for human segmentation.
-        """
-        self.session = new_session(model_name)
-
-    def remove_background(self, image: np.ndarray) -> np.ndarray:
-        """
-        Remove background from an image.
-
-        Args:
-            image: BGR image from OpenCV
-
-        Returns:
-            BGRA image with transparent background
-        """
-        # Convert BGR -> RGB
-        image_rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
-
-        # Convert to PIL Image
-        pil_image = Image.fromarray(image_rgb)
-
-        # Remove background
-        output = remove(pil_image, session=self.session)
-
-        # Convert back to numpy array (RGBA)
-        image_rgba = np.array(output)
-
-        # Convert RGB -> BGR (keeping alpha channel)
-        image_bgra = cv2.cvtColor(image_rgba, cv2.COLOR_RGBA2BGRA)
-
-        return image_bgra
-
-    def apply_background_color(
-        self,
-        image: np.ndarray,
-        background_color: tuple[int, int, int]
-    ) -> np.ndarray:
-        """
-        Replace transparent background with a solid color.
-
-        Args:
-            image: BGRA image with alpha channel
-            background_color: RGB tuple for background
-
-        Returns:
-            BGR image with solid background
-        """
-        if image.shape[2] != 4:
-            return image
-
-        # Create BGR background
-        result = np.full(
-            (image.shape[0], image.shape[1], 3),
-            background_color,
-            dtype=np.uint8
-        )
-
-        # Alpha blending
-        alpha = image[:, :, 3:4] / 255.0
-        result = (result * (1 - alpha) + image[:, :, 0:3] * alpha).astype(np.uint8)
-
-        return result
+"""Background removal using rembg with u2net_human_seg model."""
+
+import threading
+
+import cv2
+import numpy as np
+from PIL import Image
+from rembg import remove, new_session
+from typing import Optional
+
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+# Fallback model input resolution (u2net) and ImageNet normalization
+# used by rembg
+_DEFAULT_MODEL_SIZE = (320, 320)
+_MEAN = np.array([0.485, 0.456, 0.406], dtype=np.float32).reshape(3, 1, 1)
+_STD = np.array([0.229, 0.224, 0.225], dtype=np.float32).reshape(3, 1, 1)
+
+# Largest share of partially transparent pixels blended selectively
+_SPARSE_BLEND_RATIO = 0.1
+
+
+def _blend(pixels: np.ndarray, background: np.ndarray) -> np.ndarray:
+    """
+    Blend BGRA pixels over a uint16 background color.
+
+    Fixed-point alpha blending; x/255 is computed as
+    (x + 128 + ((x + 128) >> 8)) >> 8.
+    """
+    alpha = pixels[..., 3:4].astype(np.uint16)
+    result = np.multiply(pixels[..., 0:3], alpha, dtype=np.uint16)
+    result += background * (255 - alpha)
+    result += 128
+    result += result >> 8
+    result >>= 8
+    return result.astype(np.uint8)
+
+
+if njit is not None:
+    # Serial on purpose: the blend is memory-bound, and parallel kernels
+    # launched from several worker threads can abort the process under
+    # numba's default workqueue threading layer
+    @njit(cache=False)
+    def _blend_bgra(image, background, out):
+        """Single-pass fixed-point blend of a BGRA image over a color."""
+        h, w = image.shape[:2]
+        for y in range(h):
+            for x in range(w):
+                a = np.uint16(image[y, x, 3])
+                ia = np.uint16(255) - a
+                for c in range(3):
+                    v = np.uint16(image[y, x, c]) * a + background[c] * ia + 128
+                    out[y, x, c] = (v + (v >> 8)) >> 8
+else:
+    _blend_bgra = None
+
+
+class BackgroundRemover:
+    """AI-powered background removal using u2net_human_seg model."""
+
+    def __init__(self, model_name: str = "u2net_human_seg"):
+        """
+        Initialize the background remover.
+
+        Args:
+            model_name: The rembg model to use. Default is u2net_human_seg
+                       which is optimized for human segmentation.
+        """
+        self.session = new_session(model_name)
+
+        # Run the underlying ONNX session directly when rembg exposes it,
+        # with an input buffer and I/O binding per worker thread
+        self._ort_session = getattr(self.session, "inner_session", None)
+        self._local = threading.local()
+        if self._ort_session is not None:
+            model_input = self._ort_session.get_inputs()[0]
+            self._input_name = model_input.name
+            self._output_name = self._ort_session.get_outputs()[0].name
+            # (width, height) from the NCHW input shape, unless it is dynamic
+            input_h, input_w = model_input.shape[2:]
+            if isinstance(input_h, int) and isinstance(input_w, int):
+                self._model_size = (input_w, input_h)
+            else:
+                self._model_size = _DEFAULT_MODEL_SIZE
+
+    def _get_binding(self):
+        """Return this thread's (input buffer, I/O binding) pair."""
+        binding = getattr(self._local, "binding", None)
+        if binding is None:
+            buffer = np.empty((1, 3, *self._model_size[::-1]), dtype=np.float32)
+            io_binding = self._ort_session.io_binding()
+            io_binding.bind_cpu_input(self._input_name, buffer)
+            binding = self._local.binding = (buffer, io_binding)
+        return binding
+
+    def remove_background(self, image: np.ndarray) -> np.ndarray:
+        """
+        Remove background from an image.
+
+        Args:
+            image: BGR image from OpenCV
+
+        Returns:
+            BGRA image with transparent background
+        """
+        if self._ort_session is None:
+            return self._remove_with_rembg(image)
+
+        h, w = image.shape[:2]
+        resized = cv2.resize(image, self._model_size, interpolation=cv2.INTER_AREA)
+        blob = cv2.dnn.blobFromImage(
+            resized, scalefactor=1.0 / max(int(resized.max()), 1), swapRB=True
+        )
+
+        # InferenceSession runs are thread-safe; only the binding is per thread
+        buffer, binding = self._get_binding()
+        np.subtract(blob, _MEAN, out=buffer)
+        buffer /= _STD
+        binding.bind_output(self._output_name)
+        self._ort_session.run_with_iobinding(binding)
+        pred = binding.copy_outputs_to_cpu()[0][0, 0]
+
+        # Min-max normalize the prediction into an 8-bit matte
+        mask = cv2.normalize(pred, None, 0, 255, cv2.NORM_MINMAX, cv2.CV_8U)
+        mask = cv2.resize(mask, (w, h), interpolation=cv2.INTER_LINEAR)
+
+        # Same cutout as rembg: colors premultiplied by the matte
+        bgr = cv2.multiply(image, cv2.merge([mask, mask, mask]), scale=1 / 255.0)
+        return cv2.merge([bgr, mask])
+
+    def _remove_with_rembg(self, image: np.ndarray) -> np.ndarray:
+        """Remove background through rembg's PIL-based API."""
+        # Convert BGR -> RGB
+        image_rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+
+        # Convert to PIL Image
+        pil_image = Image.fromarray(image_rgb)
+
+        # Remove background
+        output = remove(pil_image, session=self.session)
+
+        # Convert back to numpy array (RGBA)
+        image_rgba = np.array(output)
+
+        # Convert RGB -> BGR (keeping alpha channel)
+        image_bgra = cv2.cvtColor(image_rgba, cv2.COLOR_RGBA2BGRA)
+
+        return image_bgra
+
+    def apply_background_color(
+        self,
+        image: np.ndarray,
+        background_color: tuple[int, int, int]
+    ) -> np.ndarray:
+        """
+        Replace transparent background with a solid color.
+
+        Args:
+            image: BGRA image with alpha channel
+            background_color: RGB tuple for background
+
+        Returns:
+            BGR image with solid background
+        """
+        if image.shape[2] != 4:
+            return image
+
+        background = np.array(background_color, dtype=np.uint16)
+        if _blend_bgra is not None:
+            result = np.empty(image.shape[:2] + (3,), dtype=np.uint8)
+            _blend_bgra(image, background, result)
+            return result
+
+        alpha = image[:, :, 3]
+
+        # Oval cutouts are mostly fully opaque or fully transparent; copy
+        # those pixels and blend only the partially transparent rim
+        partial = cv2.inRange(alpha, 1, 254)
+        if cv2.countNonZero(partial) < _SPARSE_BLEND_RATIO * partial.size:
+            result = cv2.cvtColor(image, cv2.COLOR_BGRA2BGR)
+            result[alpha == 0] = background_color
+            partial = partial.astype(bool)
+            result[partial] = _blend(image[partial], background)
+            return result
+
+        return _blend(image, background)
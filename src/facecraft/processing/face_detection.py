@@ -1,187 +1,311 @@
-"""Face detection and alignment using dlib."""
-
-import cv2
-import numpy as np
-import dlib
-from typing import Optional
-from pathlib import Path
-
-
-class FaceDetector:
-    """Face detection using dlib's frontal face detector."""
-
-    def __init__(self, predictor_path: Optional[str] = None):
-        """
-        Initialize the face detector.
-
-        Args:
-            predictor_path: Path to dlib shape predictor model for 68-point landmarks.
-                          If provided, enables face alignment.
-        """
-        self.face_detector = dlib.get_frontal_face_detector()
-        self.predictor = None
-
-        if predictor_path and Path(predictor_path).exists():
-            try:
-                self.predictor = dlib.shape_predictor(predictor_path)
-            except Exception as e:
-                print(f"Warning: Could not load shape predictor: {e}")
-
-    @property
-    def has_predictor(self) -> bool:
-        """Check if shape predictor is loaded."""
-        return self.predictor is not None
-
-    def detect_face(self, image: np.ndarray) -> Optional[dlib.rectangle]:
-        """
-        Detect face in image.
-
-        Args:
-            image: BGR or RGB image
-
-        Returns:
-            dlib.rectangle with face position or None if no face found
-        """
-        # Convert to grayscale
-        if len(image.shape) == 3:
-            gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-        else:
-            gray = image
-
-        # Detect faces
-        faces = self.face_detector(gray, 1)
-
-        if len(faces) == 0:
-            return None
-
-        if len(faces) > 1:
-            # Return the largest face
-            faces = sorted(faces, key=lambda r: r.width() * r.height(), reverse=True)
-
-        return faces[0]
-
-    def detect_all_faces(self, image: np.ndarray) -> list[dlib.rectangle]:
-        """
-        Detect all faces in image.
-
-        Args:
-            image: BGR or RGB image
-
-        Returns:
-            List of dlib.rectangle with face positions
-        """
-        if len(image.shape) == 3:
-            gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-        else:
-            gray = image
-
-        faces = self.face_detector(gray, 1)
-        return list(faces)
-
-    def get_landmarks(
-        self,
-        image: np.ndarray,
-        face_rect: dlib.rectangle
-    ) -> Optional[dlib.full_object_detection]:
-        """
-        Get 68 facial landmarks for a detected face.
-
-        Args:
-            image: BGR or grayscale image
-            face_rect: Face bounding box
-
-        Returns:
-            68 landmark points or None if predictor not loaded
-        """
-        if self.predictor is None:
-            return None
-
-        if len(image.shape) == 3:
-            gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-        else:
-            gray = image
-
-        return self.predictor(gray, face_rect)
-
-    def align_face(
-        self,
-        image: np.ndarray,
-        landmarks: dlib.full_object_detection
-    ) -> np.ndarray:
-        """
-        Align face based on eye positions.
-
-        Args:
-            image: BGRA image
-            landmarks: 68 landmark points
-
-        Returns:
-            Aligned image
-        """
-        # Eye positions (dlib 68-point model)
-        left_eye = np.mean(
-            [(landmarks.part(i).x, landmarks.part(i).y) for i in range(36, 42)],
-            axis=0
-        )
-        right_eye = np.mean(
-            [(landmarks.part(i).x, landmarks.part(i).y) for i in range(42, 48)],
-            axis=0
-        )
-
-        # Calculate angle
-        dx = right_eye[0] - left_eye[0]
-        dy = right_eye[1] - left_eye[1]
-        angle = np.degrees(np.arctan2(dy, dx))
-
-        # Rotation center (between eyes)
-        center = (
-            (left_eye[0] + right_eye[0]) / 2,
-            (left_eye[1] + right_eye[1]) / 2
-        )
-
-        # Rotation matrix
-        M = cv2.getRotationMatrix2D(center, angle, 1.0)
-
-        # Apply rotation
-        h, w = image.shape[:2]
-        aligned = cv2.warpAffine(
-            image, M, (w, h),
-            flags=cv2.INTER_CUBIC,
-            borderMode=cv2.BORDER_CONSTANT,
-            borderValue=(0, 0, 0, 0)
-        )
-
-        return aligned
-
-    def crop_face(
-        self,
-        image: np.ndarray,
-        face_rect: dlib.rectangle,
-        margin: float = 0.3
-    ) -> np.ndarray:
-        """
-        Crop and center face with margin.
-
-        Args:
-            image: BGRA image
-            face_rect: Face bounding box
-            margin: Margin around face (0.0-1.0)
-
-        Returns:
-            Cropped image
-        """
-        h, w = image.shape[:2]
-
-        face_w = face_rect.width()
-        face_h = face_rect.height()
-
-        margin_w = int(face_w * margin)
-        margin_h = int(face_h * margin)
-
-        # More margin on top for forehead
-        x1 = max(0, face_rect.left() - margin_w)
-        y1 = max(0, face_rect.top() - int(margin_h * 1.5))
-        x2 = min(w, face_rect.right() + margin_w)
-        y2 = min(h, face_rect.bottom() + margin_h)
-
-        return image[y1:y2, x1:x2]
+"""Face detection and alignment using dlib."""
+
+import threading
+import cv2
+import numpy as np
+import dlib
+from typing import Optional
+from pathlib import Path
+
+# Images larger than this (longest side, pixels) are downscaled for detection
+DETECT_MAX_SIDE = 640
+
+
+class FaceDetector:
+    """Face detection using dlib's frontal face detector."""
+
+    def __init__(self, predictor_path: Optional[str] = None):
+        """
+        Initialize the face detector.
+
+        Args:
+            predictor_path: Path to dlib shape predictor model for 68-point landmarks.
+                          If provided, enables face alignment.
+        """
+        self.face_detector = dlib.get_frontal_face_detector()
+        self.predictor = None
+
+        # dlib detectors must not be shared between threads; each worker
+        # thread lazily gets its own (construction is cheap)
+        self._local = threading.local()
+        self._local.face_detector = self.face_detector
+
+        if predictor_path and Path(predictor_path).exists():
+            try:
+                self.predictor = dlib.shape_predictor(predictor_path)
+            except Exception as e:
+                print(f"Warning: Could not load shape predictor: {e}")
+
+    @property
+    def has_predictor(self) -> bool:
+        """Check if shape predictor is loaded."""
+        return self.predictor is not None
+
+    def _get_detector(self):
+        """Get the face detector owned by the calling thread."""
+        detector = getattr(self._local, "face_detector", None)
+        if detector is None:
+            detector = dlib.get_frontal_face_detector()
+            self._local.face_detector = detector
+        return detector
+
+    @staticmethod
+    def _to_gray(image: np.ndarray, gray: Optional[np.ndarray]) -> np.ndarray:
+        """Return the precomputed grayscale image or convert once."""
+        if gray is not None:
+            return gray
+        if len(image.shape) == 3:
+            return cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        return image
+
+    def _detect_scaled(
+        self,
+        gray: np.ndarray,
+        max_side: int = DETECT_MAX_SIDE
+    ) -> list[dlib.rectangle]:
+        """
+        Run the HOG detector at bounded resolution.
+
+        Large images are downscaled to max_side, then the rectangles are
+        mapped back to full resolution. Every image is scanned with one
+        upsampling step, so the scanned resolution never drops as the
+        input grows past max_side.
+        """
+        h, w = gray.shape[:2]
+        scale = max_side / max(h, w)
+        if scale >= 1.0:
+            return list(self._get_detector()(gray, 1))
+
+        small = cv2.resize(
+            gray, (round(w * scale), round(h * scale)), interpolation=cv2.INTER_AREA
+        )
+        return [
+            dlib.rectangle(
+                round(r.left() / scale),
+                round(r.top() / scale),
+                round(r.right() / scale),
+                round(r.bottom() / scale)
+            )
+            for r in self._get_detector()(small, 1)
+        ]
+
+    def detect_face(
+        self,
+        image: np.ndarray,
+        gray: Optional[np.ndarray] = None,
+        max_side: int = DETECT_MAX_SIDE
+    ) -> Optional[dlib.rectangle]:
+        """
+        Detect face in image.
+
+        Args:
+            image: BGR or RGB image
+            gray: Precomputed grayscale version of image (optional)
+            max_side: Longest side the detector scans at; larger images are
+                downscaled first
+
+        Returns:
+            dlib.rectangle with face position or None if no face found
+        """
+        # Convert to grayscale
+        gray = self._to_gray(image, gray)
+
+        # Detect faces
+        faces = self._detect_scaled(gray, max_side)
+
+        if len(faces) == 0:
+            return None
+
+        if len(faces) > 1:
+            # Return the largest face
+            faces = sorted(faces, key=lambda r: r.width() * r.height(), reverse=True)
+
+        return faces[0]
+
+    def detect_all_faces(
+        self,
+        image: np.ndarray,
+        gray: Optional[np.ndarray] = None,
+        max_side: int = DETECT_MAX_SIDE
+    ) -> list[dlib.rectangle]:
+        """
+        Detect all faces in image.
+
+        Args:
+            image: BGR or RGB image
+            gray: Precomputed grayscale version of image (optional)
+            max_side: Longest side the detector scans at; larger images are
+                downscaled first
+
+        Returns:
+            List of dlib.rectangle with face positions
+        """
+        gray = self._to_gray(image, gray)
+
+        return self._detect_scaled(gray, max_side)
+
+    def get_landmarks(
+        self,
+        image: np.ndarray,
+        face_rect: dlib.rectangle,
+        gray: Optional[np.ndarray] = None
+    ) -> Optional[dlib.full_object_detection]:
+        """
+        Get 68 facial landmarks for a detected face.
+
+        Args:
+            image: BGR or grayscale image
+            face_rect: Face bounding box
+            gray: Precomputed grayscale version of image (optional)
+
+        Returns:
+            68 landmark points or None if predictor not loaded
+        """
+        if self.predictor is None:
+            return None
+
+        return self.predictor(self._to_gray(image, gray), face_rect)
+
+    @staticmethod
+    def landmarks_to_array(landmarks: dlib.full_object_detection) -> np.ndarray:
+        """
+        Convert dlib landmarks to an (N, 2) float array of (x, y) points.
+
+        Args:
+            landmarks: Landmark points from get_landmarks
+
+        Returns:
+            Array of landmark coordinates
+        """
+        n = landmarks.num_parts
+        return np.fromiter(
+            (c for p in landmarks.parts() for c in (p.x, p.y)),
+            dtype=np.float64,
+            count=2 * n
+        ).reshape(n, 2)
+
+    def align_face(
+        self,
+        image: np.ndarray,
+        landmarks: dlib.full_object_detection
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Align face based on eye positions.
+
+        Args:
+            image: BGRA image
+            landmarks: 68 landmark points
+
+        Returns:
+            Tuple of (aligned image, 2x3 rotation matrix used)
+        """
+        # Eye positions (dlib 68-point model)
+        points = self.landmarks_to_array(landmarks)
+        left_eye = points[36:42].mean(axis=0)
+        right_eye = points[42:48].mean(axis=0)
+
+        # Calculate angle
+        dx = right_eye[0] - left_eye[0]
+        dy = right_eye[1] - left_eye[1]
+        angle = np.degrees(np.arctan2(dy, dx))
+
+        # Rotation center (between eyes)
+        center = (
+            (left_eye[0] + right_eye[0]) / 2,
+            (left_eye[1] + right_eye[1]) / 2
+        )
+
+        # Rotation matrix
+        M = cv2.getRotationMatrix2D(center, angle, 1.0)
+
+        # Apply rotation
+        h, w = image.shape[:2]
+        aligned = cv2.warpAffine(
+            image, M, (w, h),
+            flags=cv2.INTER_CUBIC,
+            borderMode=cv2.BORDER_CONSTANT,
+            borderValue=(0, 0, 0, 0)
+        )
+
+        return aligned, M
+
+    @staticmethod
+    def scale_rect(face_rect: dlib.rectangle, factor: int) -> dlib.rectangle:
+        """
+        Scale a face rectangle by an integer factor.
+
+        Args:
+            face_rect: Face bounding box
+            factor: Scale factor
+
+        Returns:
+            Scaled face bounding box
+        """
+        return dlib.rectangle(
+            face_rect.left() * factor,
+            face_rect.top() * factor,
+            face_rect.right() * factor,
+            face_rect.bottom() * factor
+        )
+
+    @staticmethod
+    def transform_rect(face_rect: dlib.rectangle, matrix: np.ndarray) -> dlib.rectangle:
+        """
+        Map a face rectangle through an alignment transform.
+
+        The center is moved with the affine transform and the size kept,
+        which matches the upright box a detector would report on the
+        aligned image.
+
+        Args:
+            face_rect: Face bounding box in the original image
+            matrix: 2x3 affine matrix from align_face
+
+        Returns:
+            Face bounding box in the aligned image
+        """
+        cx = (face_rect.left() + face_rect.right()) / 2
+        cy = (face_rect.top() + face_rect.bottom()) / 2
+        new_cx = matrix[0, 0] * cx + matrix[0, 1] * cy + matrix[0, 2]
+        new_cy = matrix[1, 0] * cx + matrix[1, 1] * cy + matrix[1, 2]
+        half_w = face_rect.width() / 2
+        half_h = face_rect.height() / 2
+        return dlib.rectangle(
+            round(new_cx - half_w),
+            round(new_cy - half_h),
+            round(new_cx + half_w),
+            round(new_cy + half_h)
+        )
+
+    def crop_face(
+        self,
+        image: np.ndarray,
+        face_rect: dlib.rectangle,
+        margin: float = 0.3
+    ) -> np.ndarray:
+        """
+        Crop and center face with margin.
+
+        Args:
+            image: BGRA image
+            face_rect: Face bounding box
+            margin: Margin around face (0.0-1.0)
+
+        Returns:
+            Cropped image
+        """
+        h, w = image.shape[:2]
+
+        face_w = face_rect.width()
+        face_h = face_rect.height()
+
+        margin_w = int(face_w * margin)
+        margin_h = int(face_h * margin)
+
+        # More margin on top for forehead
+        x1 = max(0, face_rect.left() - margin_w)
+        y1 = max(0, face_rect.top() - int(margin_h * 1.5))
+        x2 = min(w, face_rect.right() + margin_w)
+        y2 = min(h, face_rect.bottom() + margin_h)
+
+        return image[y1:y2, x1:x2]
@@ -1,319 +1,519 @@
-"""Main photo processor that combines all processing modules."""
-
-import os
-import cv2
-import numpy as np
-from typing import Optional
-from pathlib import Path
-from dataclasses import dataclass, field
-
-from .background import BackgroundRemover
-from .face_detection import FaceDetector
-from .face_enhancement import FaceEnhancer
-from .photo_enhancement import PhotoEnhancer, OvalMask, ImageResizer
-
-
-@dataclass
-class ProcessingResult:
-    """Result of photo processing."""
-    success: bool
-    face_detected: bool = False
-    face_count: int = 0
-    face_position: Optional[dict] = None
-    output_path: Optional[str] = None
-    png_path: Optional[str] = None
-    jpg_path: Optional[str] = None
-    file_size_bytes: int = 0
-    error: Optional[str] = None
-
-
-@dataclass
-class ProcessingOptions:
-    """Options for photo processing."""
-    width: int = 648
-    height: int = 648
-    background_color: tuple[int, int, int] = (240, 240, 240)
-    face_margin: float = 0.3
-    use_oval_mask: bool = True
-    enhance_face: bool = True
-    enhance_fidelity: float = 0.7
-    enhance_photo: bool = True
-    max_jpeg_size_kb: Optional[int] = 99
-
-
-class PhotoProcessor:
-    """
-    Main processor for portrait photo enhancement.
-
-    Combines background removal, face detection, alignment,
-    and enhancement into a single processing pipeline.
-    """
-
-    def __init__(
-        self,
-        predictor_path: Optional[str] = None,
-        codeformer_path: Optional[str] = None,
-        device: str = "auto"
-    ):
-        """
-        Initialize the photo processor.
-
-        Args:
-            predictor_path: Path to dlib shape predictor model
-            codeformer_path: Path to CodeFormer model
-            device: Device for ML models ("cpu", "cuda", or "auto")
-        """
-        # Initialize components
-        self.background_remover = BackgroundRemover()
-        self.face_detector = FaceDetector(predictor_path)
-        self.face_enhancer = FaceEnhancer(codeformer_path, device)
-        self.photo_enhancer = PhotoEnhancer()
-
-        # Statistics
-        self.stats = {
-            'total': 0,
-            'success': 0,
-            'no_face': 0,
-            'errors': 0
-        }
-
-    @property
-    def has_face_alignment(self) -> bool:
-        """Check if face alignment is available."""
-        return self.face_detector.has_predictor
-
-    @property
-    def has_face_enhancement(self) -> bool:
-        """Check if face enhancement is available."""
-        return self.face_enhancer.is_available
-
-    def process_image(
-        self,
-        input_path: str,
-        output_path: str,
-        options: Optional[ProcessingOptions] = None
-    ) -> ProcessingResult:
-        """
-        Process a single image through the full pipeline.
-
-        Args:
-            input_path: Path to input image
-            output_path: Path for output image
-            options: Processing options
-
-        Returns:
-            ProcessingResult with details about the processing
-        """
-        self.stats['total'] += 1
-        options = options or ProcessingOptions()
-
-        try:
-            # 1. Load image
-            image = cv2.imread(input_path)
-            if image is None:
-                raise ValueError(f"Could not load image: {input_path}")
-
-            # 2. Face enhancement (CodeFormer)
-            if options.enhance_face and self.face_enhancer.is_available:
-                image = self.face_enhancer.enhance(image, options.enhance_fidelity)
-
-            # 3. Detect face
-            face_rect = self.face_detector.detect_face(image)
-            if face_rect is None:
-                self.stats['no_face'] += 1
-                return ProcessingResult(
-                    success=False,
-                    face_detected=False,
-                    error="no_face_detected"
-                )
-
-            face_position = {
-                'x': face_rect.left(),
-                'y': face_rect.top(),
-                'width': face_rect.width(),
-                'height': face_rect.height()
-            }
-
-            # 4. Remove background
-            image_no_bg = self.background_remover.remove_background(image)
-
-            # 5. Align face (if predictor available)
-            landmarks = None
-            if self.face_detector.has_predictor:
-                landmarks = self.face_detector.get_landmarks(image, face_rect)
-                if landmarks is not None:
-                    image_no_bg = self.face_detector.align_face(image_no_bg, landmarks)
-                    # Re-detect face after alignment
-                    new_face_rect = self.face_detector.detect_face(image_no_bg)
-                    if new_face_rect is not None:
-                        face_rect = new_face_rect
-
-            # 6. Crop and center face
-            cropped = self.face_detector.crop_face(
-                image_no_bg,
-                face_rect,
-                options.face_margin
-            )
-
-            # 7. Photo enhancement
-            if options.enhance_photo:
-                enhanced = self.photo_enhancer.enhance(cropped)
-            else:
-                enhanced = cropped
-
-            # 8. Apply oval mask
-            if options.use_oval_mask:
-                enhanced = OvalMask.apply(enhanced)
-
-            # 9. Resize with padding
-            final = ImageResizer.resize_with_padding(
-                enhanced,
-                (options.width, options.height),
-                options.background_color,
-                use_transparent=options.use_oval_mask
-            )
-
-            # 10. Save output
-            result = self._save_output(
-                final,
-                output_path,
-                options
-            )
-
-            self.stats['success'] += 1
-            result.face_detected = True
-            result.face_count = 1
-            result.face_position = face_position
-
-            return result
-
-        except Exception as e:
-            self.stats['errors'] += 1
-            return ProcessingResult(
-                success=False,
-                error=str(e)
-            )
-
-    def _save_output(
-        self,
-        image: np.ndarray,
-        output_path: str,
-        options: ProcessingOptions
-    ) -> ProcessingResult:
-        """Save the processed image."""
-        result = ProcessingResult(success=True)
-        output_dir = os.path.dirname(output_path)
-        base_name = Path(output_path).stem
-
-        # Save PNG (with transparency if oval mask)
-        if options.use_oval_mask:
-            png_path = os.path.join(output_dir, f"{base_name}.png")
-            cv2.imwrite(png_path, image, [cv2.IMWRITE_PNG_COMPRESSION, 9])
-            result.png_path = png_path
-            result.output_path = png_path
-            result.file_size_bytes = os.path.getsize(png_path)
-
-        # Save JPEG copy
-        jpg_dir = os.path.join(output_dir, 'jpg')
-        os.makedirs(jpg_dir, exist_ok=True)
-        jpg_path = os.path.join(jpg_dir, f"{base_name}.jpg")
-
-        # Convert BGRA to BGR with background
-        if image.shape[2] == 4:
-            jpeg_image = np.full(
-                (image.shape[0], image.shape[1], 3),
-                options.background_color,
-                dtype=np.uint8
-            )
-            alpha = image[:, :, 3:4] / 255.0
-            jpeg_image = (jpeg_image * (1 - alpha) + image[:, :, 0:3] * alpha).astype(np.uint8)
-        else:
-            jpeg_image = image
-
-        # Adaptive quality for size limit
-        if options.max_jpeg_size_kb:
-            quality = 90
-            max_size_bytes = options.max_jpeg_size_kb * 1024
-            cv2.imwrite(jpg_path, jpeg_image, [cv2.IMWRITE_JPEG_QUALITY, quality])
-
-            while os.path.getsize(jpg_path) > max_size_bytes and quality > 50:
-                quality -= 3
-                cv2.imwrite(jpg_path, jpeg_image, [cv2.IMWRITE_JPEG_QUALITY, quality])
-        else:
-            cv2.imwrite(jpg_path, jpeg_image, [cv2.IMWRITE_JPEG_QUALITY, 90])
-
-        result.jpg_path = jpg_path
-
-        if not options.use_oval_mask:
-            result.output_path = jpg_path
-            result.file_size_bytes = os.path.getsize(jpg_path)
-
-        return result
-
-    def process_image_bytes(
-        self,
-        image_bytes: bytes,
-        options: Optional[ProcessingOptions] = None
-    ) -> tuple[Optional[bytes], Optional[bytes], ProcessingResult]:
-        """
-        Process an image from bytes.
-
-        Args:
-            image_bytes: Image data as bytes
-            options: Processing options
-
-        Returns:
-            Tuple of (png_bytes, jpg_bytes, result)
-        """
-        import tempfile
-        import uuid
-
-        options = options or ProcessingOptions()
-
-        # Save to temp file
-        temp_id = str(uuid.uuid4())[:8]
-        with tempfile.TemporaryDirectory() as temp_dir:
-            input_path = os.path.join(temp_dir, f"input_{temp_id}.jpg")
-            output_path = os.path.join(temp_dir, f"output_{temp_id}.png")
-
-            # Write input
-            with open(input_path, 'wb') as f:
-                f.write(image_bytes)
-
-            # Process
-            result = self.process_image(input_path, output_path, options)
-
-            if not result.success:
-                return None, None, result
-
-            # Read outputs
-            png_bytes = None
-            jpg_bytes = None
-
-            if result.png_path and os.path.exists(result.png_path):
-                with open(result.png_path, 'rb') as f:
-                    png_bytes = f.read()
-
-            if result.jpg_path and os.path.exists(result.jpg_path):
-                with open(result.jpg_path, 'rb') as f:
-                    jpg_bytes = f.read()
-
-            return png_bytes, jpg_bytes, result
-
-    def get_stats(self) -> dict:
-        """Get processing statistics."""
-        stats = self.stats.copy()
-        if stats['total'] > 0:
-            stats['success_rate'] = stats['success'] / stats['total']
-        else:
-            stats['success_rate'] = 0.0
-        return stats
-
-    def reset_stats(self):
-        """Reset processing statistics."""
-        self.stats = {
-            'total': 0,
-            'success': 0,
-            'no_face': 0,
-            'errors': 0
-        }
+"""Main photo processor that combines all processing modules."""
+
+import io
+import os
+import threading
+import cv2
+import numpy as np
+from PIL import Image
+from typing import Iterable, Optional
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from dataclasses import dataclass, field
+
+from .background import BackgroundRemover
+from .face_detection import FaceDetector, DETECT_MAX_SIDE
+from .face_enhancement import FaceEnhancer
+from .photo_enhancement import PhotoEnhancer, ImageResizer
+
+# JPEG quality steps tried when fitting a size limit (highest first)
+_JPEG_QUALITIES = tuple(range(90, 47, -3))
+
+# Decode flags for JPEG DCT downscaling, by reduction factor
+_REDUCED_READ_FLAGS = {
+    1: cv2.IMREAD_COLOR,
+    2: cv2.IMREAD_REDUCED_COLOR_2,
+    4: cv2.IMREAD_REDUCED_COLOR_4,
+}
+
+
+@dataclass(slots=True)
+class ProcessingResult:
+    """Result of photo processing."""
+    success: bool
+    face_detected: bool = False
+    face_count: int = 0
+    face_position: Optional[dict] = None
+    output_path: Optional[str] = None
+    png_path: Optional[str] = None
+    jpg_path: Optional[str] = None
+    file_size_bytes: int = 0
+    # Encoded outputs as written to png_path/jpg_path
+    png_bytes: Optional[bytes] = field(default=None, repr=False)
+    jpg_bytes: Optional[bytes] = field(default=None, repr=False)
+    error: Optional[str] = None
+
+
+@dataclass(slots=True, frozen=True)
+class ProcessingOptions:
+    """Options for photo processing."""
+    width: int = 648
+    height: int = 648
+    background_color: tuple[int, int, int] = (240, 240, 240)
+    face_margin: float = 0.3
+    use_oval_mask: bool = True
+    enhance_face: bool = True
+    enhance_fidelity: float = 0.7
+    enhance_photo: bool = True
+    max_jpeg_size_kb: Optional[int] = 99
+    png_compression: int = 3
+    detect_max_side: int = DETECT_MAX_SIDE
+
+
+class PhotoProcessor:
+    """
+    Main processor for portrait photo enhancement.
+
+    Combines background removal, face detection, alignment,
+    and enhancement into a single processing pipeline.
+    """
+
+    def __init__(
+        self,
+        predictor_path: Optional[str] = None,
+        codeformer_path: Optional[str] = None,
+        device: str = "auto",
+        face_batch_size: int = 1,
+        face_batch_wait_ms: float = 10.0,
+        torch_compile: bool = False,
+        cuda_graphs: bool = False
+    ):
+        """
+        Initialize the photo processor.
+
+        Args:
+            predictor_path: Path to dlib shape predictor model
+            codeformer_path: Path to CodeFormer model
+            device: Device for ML models ("cpu", "cuda", or "auto")
+            face_batch_size: Maximum faces per CodeFormer batch (1 disables batching)
+            face_batch_wait_ms: Time to wait for a CodeFormer batch to fill up
+            torch_compile: Compile CodeFormer with torch.compile at load time
+            cuda_graphs: Replay captured CUDA graphs for single-face CodeFormer runs
+        """
+        # Initialize components
+        self.background_remover = BackgroundRemover()
+        self.face_detector = FaceDetector(predictor_path)
+        self.face_enhancer = FaceEnhancer(
+            codeformer_path,
+            device,
+            face_batch_size,
+            face_batch_wait_ms,
+            torch_compile,
+            cuda_graphs
+        )
+        self.photo_enhancer = PhotoEnhancer()
+
+        # Statistics (updated from worker threads)
+        self._stats_lock = threading.Lock()
+        self.stats = {
+            'total': 0,
+            'success': 0,
+            'no_face': 0,
+            'errors': 0
+        }
+
+    def _count(self, key: str):
+        """Increment a statistics counter."""
+        with self._stats_lock:
+            self.stats[key] += 1
+
+    def warmup(self):
+        """Run each model once on a synthetic image."""
+        dummy = np.zeros((512, 512, 3), dtype=np.uint8)
+        cutout = self.background_remover.remove_background(dummy)
+        self.background_remover.apply_background_color(cutout, (240, 240, 240))
+        self.face_detector.detect_face(dummy)
+        self.face_enhancer.warmup()
+
+    @property
+    def has_face_alignment(self) -> bool:
+        """Check if face alignment is available."""
+        return self.face_detector.has_predictor
+
+    @property
+    def has_face_enhancement(self) -> bool:
+        """Check if face enhancement is available."""
+        return self.face_enhancer.is_available
+
+    def process_image(
+        self,
+        input_path: str,
+        output_path: str,
+        options: Optional[ProcessingOptions] = None
+    ) -> ProcessingResult:
+        """
+        Process a single image through the full pipeline.
+
+        Args:
+            input_path: Path to input image
+            output_path: Path for output image
+            options: Processing options
+
+        Returns:
+            ProcessingResult with details about the processing
+        """
+        self._count('total')
+        options = options or ProcessingOptions()
+
+        try:
+            # 1. Load image (oversized JPEGs are decoded at reduced size)
+            with open(input_path, 'rb') as f:
+                image_bytes = f.read()
+            image, factor = self._decode(image_bytes, options)
+            if image is None:
+                raise ValueError(f"Could not load image: {input_path}")
+
+            # 2-9. Process
+            final, face_position = self._process_array(
+                image, options, image_bytes, factor
+            )
+            if final is None:
+                return self._no_face_result()
+
+            # 10. Save output
+            result = self._save_output(
+                final,
+                output_path,
+                options
+            )
+            return self._success_result(result, face_position)
+
+        except Exception as e:
+            return self._error_result(e)
+
+    def process_many(
+        self,
+        jobs: Iterable[tuple[str, str]],
+        options: Optional[ProcessingOptions] = None,
+        workers: Optional[int] = None
+    ) -> list[ProcessingResult]:
+        """
+        Process a batch of images concurrently.
+
+        dlib, OpenCV and onnxruntime release the GIL, so threads scale
+        with cores; concurrent CodeFormer calls share batches when face
+        batching is enabled.
+
+        Args:
+            jobs: (input_path, output_path) pairs
+            options: Processing options applied to every image
+            workers: Number of worker threads (defaults to the CPU count)
+
+        Returns:
+            ProcessingResult for each job, in input order
+        """
+        with ThreadPoolExecutor(max_workers=workers or os.cpu_count()) as executor:
+            return list(executor.map(
+                lambda job: self.process_image(job[0], job[1], options), jobs
+            ))
+
+    def process_image_bytes(
+        self,
+        image_bytes: bytes,
+        options: Optional[ProcessingOptions] = None
+    ) -> tuple[Optional[bytes], Optional[bytes], ProcessingResult]:
+        """
+        Process an image from bytes, entirely in memory.
+
+        Args:
+            image_bytes: Image data as bytes
+            options: Processing options
+
+        Returns:
+            Tuple of (png_bytes, jpg_bytes, result)
+        """
+        self._count('total')
+        options = options or ProcessingOptions()
+
+        try:
+            # 1. Decode image (oversized JPEGs are decoded at reduced size)
+            image, factor = self._decode(image_bytes, options)
+            if image is None:
+                raise ValueError("Could not decode image")
+
+            # 2-9. Process
+            final, face_position = self._process_array(
+                image, options, image_bytes, factor
+            )
+            if final is None:
+                return None, None, self._no_face_result()
+
+            # 10. Encode output
+            png_bytes, jpg_bytes, result = self._encode_output(final, options)
+            return png_bytes, jpg_bytes, self._success_result(result, face_position)
+
+        except Exception as e:
+            return None, None, self._error_result(e)
+
+    @staticmethod
+    def _decode(
+        image_bytes: bytes,
+        options: ProcessingOptions
+    ) -> tuple[Optional[np.ndarray], int]:
+        """
+        Decode an image, letting libjpeg downscale oversized JPEGs.
+
+        A JPEG is reduced by 2 or 4 when its long side exceeds 4x or 8x the
+        output size and stays at least the detector's working size. The
+        face may still be too small in the reduced image; _process_array
+        then decodes again at full resolution.
+
+        Args:
+            image_bytes: Encoded image data
+            options: Processing options (output and detection sizes)
+
+        Returns:
+            Tuple of (BGR image or None, reduction factor 1, 2 or 4)
+        """
+        factor = 1
+        try:
+            with Image.open(io.BytesIO(image_bytes)) as header:
+                if header.format == 'JPEG':
+                    long_side = max(header.size)
+                    target = max(options.width, options.height)
+                    for candidate, limit in ((4, 8), (2, 4)):
+                        if (long_side > limit * target
+                                and long_side // candidate >= options.detect_max_side):
+                            factor = candidate
+                            break
+        except Exception:
+            pass
+
+        image = cv2.imdecode(
+            np.frombuffer(image_bytes, np.uint8), _REDUCED_READ_FLAGS[factor]
+        )
+        return image, factor
+
+    def _process_array(
+        self,
+        image: np.ndarray,
+        options: ProcessingOptions,
+        image_bytes: Optional[bytes] = None,
+        factor: int = 1
+    ) -> tuple[Optional[np.ndarray], Optional[dict]]:
+        """
+        Run the processing pipeline on a decoded BGR image.
+
+        Args:
+            image: BGR image
+            options: Processing options
+            image_bytes: Encoded source, used to decode again at full
+                resolution when a reduced decode leaves the face too small
+            factor: Reduction factor the image was decoded with
+
+        Returns:
+            Tuple of (final image, face position), or (None, None) if no
+            face was detected
+        """
+        # 2. Detect face first so no-face inputs skip enhancement
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        face_rect = self.face_detector.detect_face(
+            image, gray=gray, max_side=options.detect_max_side
+        )
+        if face_rect is None:
+            return None, None
+
+        # A reduced decode must not leave the crop smaller than the output,
+        # or the resize would upscale it; fall back to full resolution
+        if factor > 1:
+            crop_h, crop_w = self.face_detector.crop_face(
+                gray, face_rect, options.face_margin
+            ).shape[:2]
+            if min(options.width / crop_w, options.height / crop_h) > 1.0:
+                image = cv2.imdecode(np.frombuffer(image_bytes, np.uint8), cv2.IMREAD_COLOR)
+                gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+                face_rect = self.face_detector.scale_rect(face_rect, factor)
+                factor = 1
+
+        # Face position in the coordinates of the original image
+        face_position = {
+            'x': face_rect.left() * factor,
+            'y': face_rect.top() * factor,
+            'width': face_rect.width() * factor,
+            'height': face_rect.height() * factor
+        }
+
+        # 3. Face enhancement (CodeFormer restores in place, so the
+        # detected geometry still holds)
+        if options.enhance_face and self.face_enhancer.is_available:
+            image = self.face_enhancer.enhance(image, options.enhance_fidelity)
+            # Landmarks must come from the enhanced frame that gets aligned
+            gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+
+        # 4. Remove background
+        image_no_bg = self.background_remover.remove_background(image)
+
+        # 5. Align face (if predictor available)
+        landmarks = None
+        if self.face_detector.has_predictor:
+            landmarks = self.face_detector.get_landmarks(image, face_rect, gray=gray)
+            if landmarks is not None:
+                image_no_bg, rotation = self.face_detector.align_face(image_no_bg, landmarks)
+                # Move the face box with the rotation instead of re-detecting
+                face_rect = self.face_detector.transform_rect(face_rect, rotation)
+
+        # 6. Crop and center face
+        cropped = self.face_detector.crop_face(
+            image_no_bg,
+            face_rect,
+            options.face_margin
+        )
+
+        # 7. Photo enhancement
+        if options.enhance_photo:
+            enhanced = self.photo_enhancer.enhance(cropped)
+        else:
+            enhanced = cropped
+
+        # 8-9. Resize with padding, applying the oval mask at output size
+        final = ImageResizer.resize_with_padding(
+            enhanced,
+            (options.width, options.height),
+            options.background_color,
+            use_transparent=options.use_oval_mask,
+            oval_mask=options.use_oval_mask
+        )
+
+        return final, face_position
+
+    def _no_face_result(self) -> ProcessingResult:
+        """Record and build the result for an image without a face."""
+        self._count('no_face')
+        return ProcessingResult(
+            success=False,
+            face_detected=False,
+            error="no_face_detected"
+        )
+
+    def _success_result(self, result: ProcessingResult, face_position: dict) -> ProcessingResult:
+        """Record a successful run and attach the face details."""
+        self._count('success')
+        result.face_detected = True
+        result.face_count = 1
+        result.face_position = face_position
+        return result
+
+    def _error_result(self, error: Exception) -> ProcessingResult:
+        """Record and build the result for a failed run."""
+        self._count('errors')
+        return ProcessingResult(
+            success=False,
+            error=str(error)
+        )
+
+    def _encode_output(
+        self,
+        image: np.ndarray,
+        options: ProcessingOptions
+    ) -> tuple[Optional[bytes], bytes, ProcessingResult]:
+        """Encode the processed image as PNG (oval mask only) and JPEG."""
+        result = ProcessingResult(success=True)
+
+        # PNG (with transparency if oval mask)
+        png_bytes = None
+        if options.use_oval_mask:
+            png_bytes = cv2.imencode(
+                '.png', image, [cv2.IMWRITE_PNG_COMPRESSION, options.png_compression]
+            )[1].tobytes()
+            result.file_size_bytes = len(png_bytes)
+
+        # Convert BGRA to BGR with background
+        jpeg_image = self.background_remover.apply_background_color(
+            image, options.background_color
+        )
+
+        # JPEG copy, with adaptive quality for the size limit
+        max_size_bytes = options.max_jpeg_size_kb * 1024 if options.max_jpeg_size_kb else None
+        jpg_bytes = self._encode_jpeg(jpeg_image, max_size_bytes)
+
+        if not options.use_oval_mask:
+            result.file_size_bytes = len(jpg_bytes)
+
+        return png_bytes, jpg_bytes, result
+
+    def _save_output(
+        self,
+        image: np.ndarray,
+        output_path: str,
+        options: ProcessingOptions
+    ) -> ProcessingResult:
+        """Save the processed image."""
+        png_bytes, jpg_bytes, result = self._encode_output(image, options)
+
+        output_dir = os.path.dirname(output_path)
+        base_name = Path(output_path).stem
+        jpg_dir = os.path.join(output_dir, 'jpg')
+        # Create the job directory only once there is something to write
+        os.makedirs(jpg_dir, exist_ok=True)
+
+        # Save PNG
+        if png_bytes is not None:
+            png_path = os.path.join(output_dir, f"{base_name}.png")
+            with open(png_path, 'wb') as f:
+                f.write(png_bytes)
+            result.png_path = png_path
+            result.output_path = png_path
+
+        # Save JPEG copy
+        jpg_path = os.path.join(jpg_dir, f"{base_name}.jpg")
+        with open(jpg_path, 'wb') as f:
+            f.write(jpg_bytes)
+        result.jpg_path = jpg_path
+
+        if png_bytes is None:
+            result.output_path = jpg_path
+
+        result.png_bytes = png_bytes
+        result.jpg_bytes = jpg_bytes
+        return result
+
+    @staticmethod
+    def _encode_jpeg(image: np.ndarray, max_size_bytes: Optional[int] = None) -> bytes:
+        """
+        Encode a JPEG at the highest quality step that fits the size limit.
+
+        Quality steps are 90, 87, ..., 48; the size shrinks monotonically
+        with quality, so the first step that fits is found by binary search.
+        If none fits, the lowest quality is used.
+        """
+        encoded = {}
+
+        def encode(index: int) -> bytes:
+            if index not in encoded:
+                quality = _JPEG_QUALITIES[index]
+                encoded[index] = cv2.imencode(
+                    '.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, quality]
+                )[1].tobytes()
+            return encoded[index]
+
+        if max_size_bytes is None or len(encode(0)) <= max_size_bytes:
+            return encode(0)
+
+        lo, hi = 1, len(_JPEG_QUALITIES) - 1
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if len(encode(mid)) <= max_size_bytes:
+                hi = mid
+            else:
+                lo = mid + 1
+        return encode(lo)
+
+    def get_stats(self) -> dict:
+        """Get processing statistics."""
+        with self._stats_lock:
+            stats = self.stats.copy()
+        if stats['total'] > 0:
+            stats['success_rate'] = stats['success'] / stats['total']
+        else:
+            stats['success_rate'] = 0.0
+        return stats
+
+    def reset_stats(self):
+        """Reset processing statistics."""
+        with self._stats_lock:
+            self.stats = {
+                'total': 0,
+                'success': 0,
+                'no_face': 0,
+                'errors': 0
+            }
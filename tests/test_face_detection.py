@@ -0,0 +1,56 @@
+"""Tests for bounded-resolution face detection."""
+
+import numpy as np
+import pytest
+
+dlib = pytest.importorskip("dlib")
+face_detection = pytest.importorskip("facecraft.processing.face_detection")
+
+DETECT_MAX_SIDE = face_detection.DETECT_MAX_SIDE
+
+
+class RecordingDetector:
+    """Stand-in for dlib's HOG detector that records each scan."""
+
+    def __init__(self, rects=()):
+        self.rects = list(rects)
+        self.calls = []
+
+    def __call__(self, image, upsample):
+        self.calls.append((max(image.shape[:2]), upsample))
+        return self.rects
+
+
+def _detector_with(fake):
+    detector = face_detection.FaceDetector()
+    detector._local.face_detector = fake
+    return detector
+
+
+def _scanned_side(side):
+    """Effective long side the HOG detector scans for a square input."""
+    fake = RecordingDetector()
+    _detector_with(fake).detect_all_faces(np.zeros((side, side), dtype=np.uint8))
+    (scanned, upsample), = fake.calls
+    return scanned * 2 ** upsample
+
+
+def test_detection_strength_continuous_at_threshold():
+    assert _scanned_side(DETECT_MAX_SIDE + 1) >= _scanned_side(DETECT_MAX_SIDE)
+
+
+def test_scanned_resolution_never_drops_with_input_size():
+    sides = [320, DETECT_MAX_SIDE - 1, DETECT_MAX_SIDE, DETECT_MAX_SIDE + 1,
+             2 * DETECT_MAX_SIDE, 4000]
+    scanned = [_scanned_side(side) for side in sides]
+    assert scanned == sorted(scanned)
+
+
+def test_downscaled_rectangles_map_back_to_full_resolution():
+    fake = RecordingDetector([dlib.rectangle(10, 20, 110, 120)])
+    detector = _detector_with(fake)
+    image = np.zeros((2 * DETECT_MAX_SIDE, 2 * DETECT_MAX_SIDE), dtype=np.uint8)
+
+    (rect,) = detector.detect_all_faces(image)
+
+    assert (rect.left(), rect.top(), rect.right(), rect.bottom()) == (20, 40, 220, 240)